@@ -1,9 +1,10 @@
 from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from app.providers.storage import JSONFileStorage
 from app.providers.models import LocalModelProvider
+from app.providers.resources import InferenceRejected, InferenceResourceManager, ResourceSettings
 from app.analyzer import BeliefAnalyzer
 
 app = FastAPI(
@@ -14,7 +15,8 @@ app = FastAPI(
 storage = JSONFileStorage("data/belief-history-testing.json")
 risk_storage = JSONFileStorage("data/risk-history-testing.json")
 sentiment_storage = JSONFileStorage("data/sentiment-history-testing.json")
-models = LocalModelProvider()
+resources = InferenceResourceManager(ResourceSettings.from_env())
+models = LocalModelProvider(resources)
 analyzer = BeliefAnalyzer(models, storage, risk_storage, sentiment_storage)
 
 
@@ -35,9 +37,23 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/v1/models")
+def model_memory():
+    return models.memory_report()
+
+
 @app.post("/api/v1/evaluate-beliefs")
 def evaluate_beliefs(conversation: Conversation):
-    result = analyzer.analyze_conversation(conversation.model_dump())
+    # admit the whole request up front so a full queue never leaves partial history behind
+    try:
+        with resources.admit():
+            result = analyzer.analyze_conversation(conversation.model_dump())
+    except InferenceRejected as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": str(e)},
+            headers={"Retry-After": str(e.retry_after)},
+        )
     return result
 
 
@@ -1,10 +1,20 @@
+from app.providers.residency import ModelResidency
+from app.providers.resources import InferenceResourceManager, ResourceSettings
+
+
 class LocalModelProvider:
     """Runs HuggingFace models locally."""
 
-    def __init__(self):
-        self._classifier = None
-        self._embedder = None
-        self._sentiment_grader = None
+    def __init__(self, resources: InferenceResourceManager | None = None):
+        self.resources = resources or InferenceResourceManager(ResourceSettings.from_env())
+        self.residency = ModelResidency(
+            {
+                "classifier": self._load_classifier,
+                "embedder": self._load_embedder,
+                "sentiment_grader": self._load_sentiment_grader,
+            },
+            self.resources.settings,
+        )
 
     def load_models(self):
         """Preload models into memory."""
@@ -12,33 +22,54 @@ class LocalModelProvider:
         _ = self.embedder
         _ = self.sentiment_grader
 
+    def memory_report(self) -> dict:
+        """Per-model memory and load state, see ModelResidency.memory_report."""
+        return self.residency.memory_report()
+
+    def _model_kwargs(self) -> dict:
+        """from_pretrained kwargs shared by the pipelines and the SentenceTransformer embedder."""
+        kwargs = {}
+        if self.resources.settings.low_memory:
+            # loads safetensors weights straight from the mmap'd file instead of
+            # materialising a randomly initialised copy first; needs accelerate
+            kwargs["low_cpu_mem_usage"] = True
+        if self.resources.settings.model_dtype:
+            import torch
+            kwargs["torch_dtype"] = getattr(torch, self.resources.settings.model_dtype)
+        return kwargs
+
+    def _load_classifier(self):
+        from transformers import pipeline
+        return pipeline(
+            "zero-shot-classification",
+            model="facebook/bart-large-mnli",
+            model_kwargs=self._model_kwargs(),
+        )
+
+    def _load_sentiment_grader(self):
+        from transformers import pipeline # probably already cached
+        return pipeline( # scoring is decent, but need to stay lightweight
+            "sentiment-analysis", 
+            model="lxyuan/distilbert-base-multilingual-cased-sentiments-student",
+            return_all_scores=True,
+            model_kwargs=self._model_kwargs(),
+        )
+
+    def _load_embedder(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer("all-MiniLM-L6-v2", model_kwargs=self._model_kwargs())
+
     @property
     def classifier(self):
-        if self._classifier is None:
-            from transformers import pipeline
-            self._classifier = pipeline(
-                "zero-shot-classification",
-                model="facebook/bart-large-mnli",
-            )
-        return self._classifier
+        return self.residency.get("classifier")
 
     @property
     def sentiment_grader(self):
-        if self._sentiment_grader is None:
-            from transformers import pipeline # probably already cached
-            self._sentiment_grader = pipeline( # scoring is decent, but need to stay lightweight
-                "sentiment-analysis", 
-                model="lxyuan/distilbert-base-multilingual-cased-sentiments-student",
-                return_all_scores=True,
-            )
-        return self._sentiment_grader
+        return self.residency.get("sentiment_grader")
 
     @property
     def embedder(self):
-        if self._embedder is None:
-            from sentence_transformers import SentenceTransformer
-            self._embedder = SentenceTransformer("all-MiniLM-L6-v2")
-        return self._embedder
+        return self.residency.get("embedder")
 
     def classify_belief(self, text: str, labels: list[str], multi_label: bool = False) -> dict:
         """
@@ -51,7 +82,8 @@ class LocalModelProvider:
         
         Output: {"label": str, "score": float, "all_scores": dict}
         """
-        result = self.classifier(text, labels, multi_label=multi_label)
+        with self.resources.admit(), self.residency.use("classifier") as classifier:
+            result = self.resources.run("classifier", classifier, text, labels, multi_label=multi_label)
         return {
             "label": result["labels"][0],
             "score": result["scores"][0],
@@ -67,7 +99,8 @@ class LocalModelProvider:
         
         Output: a score from positive likelihood - negative likelihood
         """
-        scores = self.sentiment_grader(text)[0]
+        with self.resources.admit(), self.residency.use("sentiment_grader") as sentiment_grader:
+            scores = self.resources.run("sentiment_grader", sentiment_grader, text)[0]
         scores = {t["label"]: t["score"] for t in scores}
         return scores["positive"] - scores["negative"]
 
@@ -81,5 +114,6 @@ class LocalModelProvider:
         
         Output: list of 384 floats
         """
-        embedding = self.embedder.encode(text)
+        with self.resources.admit(), self.residency.use("embedder") as embedder:
+            embedding = self.resources.run("embedder", embedder.encode, text)
         return embedding.tolist()
@@ -0,0 +1,208 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from app.providers.resources import ResourceSettings
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 if it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+def model_size_bytes(model) -> int | None:
+    """
+    Bytes held by a model's parameters and buffers, or None if it isn't a torch model.
+    Pipelines keep the torch module on .model; SentenceTransformer is one itself.
+    """
+    module = getattr(model, "model", model)
+    if not hasattr(module, "parameters") or not hasattr(module, "buffers"):
+        return None
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class _Slot:
+    def __init__(self, loader: Callable[[], Any]):
+        self.loader = loader
+        self.load_lock = threading.Lock()
+        self.model = None
+        # last measured size, kept across unloads so a reload can make room up front
+        self.size_bytes = 0
+        self.loading = False
+        self.last_used = 0.0
+        self.users = 0
+
+
+class ModelResidency:
+    """
+    Keeps models loaded only while they earn their memory.
+
+    use(name) loads a model on first use and holds it for the duration of the
+    call. Idle models are unloaded once they go unused for idle_unload_seconds.
+    With memory_budget_mb set, a model whose size is known from an earlier load
+    first unloads least recently used idle models until it, and any other load
+    in progress, fits; a model loaded for the first time is measured and the
+    budget is enforced right after. The budget is checked again whenever a model
+    stops being held, since models in use are never unloaded and can leave the
+    loaded set over budget for a while.
+
+    A model's size is the bytes in its parameters and buffers (its weights),
+    falling back to the process RSS growth across the load for anything that
+    isn't a torch model. Each model has its own load lock, so a caller only
+    ever waits on a load of the model it asked for.
+    """
+
+    def __init__(
+        self,
+        loaders: dict[str, Callable[[], Any]],
+        settings: ResourceSettings | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.settings = settings or ResourceSettings()
+        self._slots = {name: _Slot(loader) for name, loader in loaders.items()}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def is_loaded(self, name: str) -> bool:
+        return self._slots[name].model is not None
+
+    def get(self, name: str):
+        """Return the model, loading it if needed, without holding it."""
+        with self.use(name) as model:
+            return model
+
+    @contextmanager
+    def use(self, name: str):
+        slot = self._slots[name]
+        with self._lock:
+            slot.users += 1
+            slot.last_used = self._clock()
+            model = slot.model
+        try:
+            if model is None:
+                model = self._load(slot)
+            yield model
+        finally:
+            # drop our reference first so an eviction below can actually free the weights
+            model = None
+            with self._lock:
+                slot.users -= 1
+                slot.last_used = self._clock()
+                released = slot.users == 0
+            if released:
+                self._enforce_budget()
+
+    def _load(self, slot: _Slot):
+        with slot.load_lock:
+            # another caller may have loaded it while we waited
+            if slot.model is not None:
+                return slot.model
+            with self._lock:
+                slot.loading = True
+            try:
+                if slot.size_bytes:
+                    self._enforce_budget()
+                before = current_rss_bytes()
+                model = slot.loader()
+                size = model_size_bytes(model)
+                if size is None:
+                    # RSS growth is noisy under concurrent loads; never let a low reading shrink a known size
+                    size = max(current_rss_bytes() - before, slot.size_bytes)
+                with self._lock:
+                    slot.model = model
+                    slot.size_bytes = size
+            finally:
+                with self._lock:
+                    slot.loading = False
+            self._enforce_budget()
+            self._start_reaper()
+            return model
+
+    def _enforce_budget(self) -> None:
+        """Unload LRU idle models until loaded models plus loads in progress fit the budget."""
+        if self.settings.memory_budget_mb is None:
+            return
+        budget = self.settings.memory_budget_mb * 1024 * 1024
+        unloaded = False
+        with self._lock:
+            loaded = [s for s in self._slots.values() if s.model is not None]
+            incoming = sum(s.size_bytes for s in self._slots.values() if s.loading and s.model is None)
+            total = sum(s.size_bytes for s in loaded) + incoming
+            for slot in sorted(loaded, key=lambda s: s.last_used):
+                if total <= budget:
+                    break
+                if slot.users:
+                    continue
+                total -= slot.size_bytes
+                slot.model = None
+                unloaded = True
+        if unloaded:
+            gc.collect()
+
+    def unload_idle(self) -> list[str]:
+        """Unload models unused for longer than idle_unload_seconds."""
+        timeout = self.settings.idle_unload_seconds
+        if timeout is None:
+            return []
+        now = self._clock()
+        unloaded = []
+        with self._lock:
+            for name, slot in self._slots.items():
+                if slot.model is not None and not slot.users and now - slot.last_used >= timeout:
+                    slot.model = None
+                    unloaded.append(name)
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+    def _start_reaper(self) -> None:
+        timeout = self.settings.idle_unload_seconds
+        with self._lock:
+            if timeout is None or self._reaper is not None:
+                return
+
+            def reap():
+                while True:
+                    time.sleep(max(timeout / 2, 1))
+                    self.unload_idle()
+
+            self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def memory_report(self) -> dict:
+        """
+        Output: {"process_rss_mb": float, "budget_mb": float | None,
+                 "models": {name: {"loaded": bool, "weights_mb": float, "idle_seconds": float | None}}}
+
+        weights_mb is the model's last measured weight size, kept after it is unloaded. It is
+        an estimate of the model's share of process_rss_mb, not a per-model RSS reading.
+        """
+        now = self._clock()
+        with self._lock:
+            models = {
+                name: {
+                    "loaded": slot.model is not None,
+                    "weights_mb": round(slot.size_bytes / (1024 * 1024), 1),
+                    "idle_seconds": round(now - slot.last_used, 1) if slot.model is not None else None,
+                }
+                for name, slot in self._slots.items()
+            }
+        return {
+            "process_rss_mb": round(current_rss_bytes() / (1024 * 1024), 1),
+            "budget_mb": self.settings.memory_budget_mb,
+            "models": models,
+        }
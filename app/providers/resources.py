@@ -0,0 +1,257 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+MODEL_NAMES = ("classifier", "embedder", "sentiment_grader")
+
+# float16 is left out on purpose: CPU kernels would compute in it too, slowly and less accurately
+MODEL_DTYPES = ("float32", "bfloat16")
+
+
+class InferenceRejected(Exception):
+    """Raised when the inference queue is full or the wait for a slot times out."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_core_set(spec: str) -> set[int]:
+    """
+    Parse a core list like "0-3,6" into {0, 1, 2, 3, 6}.
+    Empty string means no pinning.
+    """
+    cores = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            if int(end) < int(start):
+                raise ValueError(f"Core range {part!r} is reversed")
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+@dataclass
+class ResourceSettings:
+    """
+    CPU and memory budget for local inference. Read from environment with from_env():
+
+        LORE_MAX_IN_FLIGHT       concurrent inferences allowed (default 2)
+        LORE_MAX_QUEUE           requests allowed to wait for a slot (default 8)
+        LORE_QUEUE_TIMEOUT       seconds a queued request waits before giving up (default 30)
+        LORE_RETRY_AFTER         Retry-After seconds sent with a 503 (default 5)
+        LORE_INTEROP_THREADS     torch inter-op pool size, set at startup (default: torch's choice)
+        LORE_THREADS_<MODEL>     intra-op threads for a model, e.g. LORE_THREADS_CLASSIFIER=4
+                                 (default: one per pinned core, else an equal share of torch's count)
+        LORE_CORES_<MODEL>       cores to pin a model's worker thread to, e.g. LORE_CORES_EMBEDDER=0-1
+        LORE_MEMORY_BUDGET_MB    budget for loaded model weights, LRU idle models unloaded past it (default: none)
+        LORE_IDLE_UNLOAD_SECONDS unload a model unused for this long (default: never)
+        LORE_LOW_MEMORY          load weights with low_cpu_mem_usage, mmap'ing safetensors (default 0)
+        LORE_MODEL_DTYPE         weight dtype, float32 or bfloat16 (default: float32; bfloat16 needs
+                                 transformers>=4.45 so pipelines cast logits to float before numpy)
+    """
+
+    max_in_flight: int = 2
+    max_queue: int = 8
+    queue_timeout: float = 30.0
+    retry_after: int = 5
+    interop_threads: int | None = None
+    model_threads: dict[str, int] = field(default_factory=dict)
+    model_cores: dict[str, set[int]] = field(default_factory=dict)
+    memory_budget_mb: float | None = None
+    idle_unload_seconds: float | None = None
+    low_memory: bool = False
+    model_dtype: str | None = None
+
+    @classmethod
+    def from_env(cls, env: dict | None = None) -> "ResourceSettings":
+        env = os.environ if env is None else env
+        settings = cls()
+        if "LORE_MAX_IN_FLIGHT" in env:
+            settings.max_in_flight = int(env["LORE_MAX_IN_FLIGHT"])
+        if "LORE_MAX_QUEUE" in env:
+            settings.max_queue = int(env["LORE_MAX_QUEUE"])
+        if "LORE_QUEUE_TIMEOUT" in env:
+            settings.queue_timeout = float(env["LORE_QUEUE_TIMEOUT"])
+        if "LORE_RETRY_AFTER" in env:
+            settings.retry_after = int(env["LORE_RETRY_AFTER"])
+        if env.get("LORE_INTEROP_THREADS"):
+            settings.interop_threads = int(env["LORE_INTEROP_THREADS"])
+        if env.get("LORE_MEMORY_BUDGET_MB"):
+            settings.memory_budget_mb = float(env["LORE_MEMORY_BUDGET_MB"])
+        if env.get("LORE_IDLE_UNLOAD_SECONDS"):
+            settings.idle_unload_seconds = float(env["LORE_IDLE_UNLOAD_SECONDS"])
+        settings.low_memory = env.get("LORE_LOW_MEMORY", "0").lower() in ("1", "true", "yes")
+        settings.model_dtype = env.get("LORE_MODEL_DTYPE") or None
+        if settings.model_dtype is not None and settings.model_dtype not in MODEL_DTYPES:
+            raise ValueError(
+                f"LORE_MODEL_DTYPE must be one of {', '.join(MODEL_DTYPES)}, got {settings.model_dtype!r}"
+            )
+        for name in MODEL_NAMES:
+            threads = env.get(f"LORE_THREADS_{name.upper()}")
+            if threads:
+                settings.model_threads[name] = int(threads)
+            cores = env.get(f"LORE_CORES_{name.upper()}")
+            if cores:
+                settings.model_cores[name] = parse_core_set(cores)
+        settings.validate()
+        return settings
+
+    def validate(self) -> None:
+        """Reject CPU settings that would otherwise only fail on the first model call."""
+        if self.max_in_flight < 1:
+            raise ValueError(f"LORE_MAX_IN_FLIGHT must be at least 1, got {self.max_in_flight}")
+        if self.interop_threads is not None and self.interop_threads < 1:
+            raise ValueError(f"LORE_INTEROP_THREADS must be at least 1, got {self.interop_threads}")
+        for name, threads in self.model_threads.items():
+            if threads < 1:
+                raise ValueError(f"LORE_THREADS_{name.upper()} must be at least 1, got {threads}")
+        usable = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+        for name, cores in self.model_cores.items():
+            if not cores:
+                raise ValueError(f"LORE_CORES_{name.upper()} names no cores")
+            if usable is not None and not cores <= usable:
+                raise ValueError(
+                    f"LORE_CORES_{name.upper()} includes cores {sorted(cores - usable)} "
+                    f"this process can't run on (available: {sorted(usable)})"
+                )
+
+
+class InferenceResourceManager:
+    """
+    Admission control and CPU budgets for model inference.
+
+    admit() caps how many inferences run at once and how many may queue behind
+    them; anything past that is rejected straight away with InferenceRejected.
+    It is reentrant per thread, so a request admitted once in main.py runs all
+    of its model calls under that single slot.
+
+    run(model_name, fn, ...) admits the caller (if not already admitted) and
+    calls fn. When any thread count or core set is configured, every model gets
+    one dedicated worker thread and fn runs there: the worker is pinned to the
+    model's cores and sets its torch intra-op thread count before it does any
+    torch work, so the OpenMP pool it spawns inherits both. Calls to the same
+    model are therefore serialised; calls to different models run in parallel.
+    A model without a thread count gets one thread per pinned core, or, when
+    unpinned, an equal share of torch's default so the three pools together
+    don't exceed it.
+
+    torch.set_num_threads also updates the process-wide default that new
+    threads start from, so after the workers start that default holds the last
+    worker's budget. Model calls never read it, only torch work done outside
+    the provider does. Without any budgets configured, fn runs on the calling
+    thread and torch's settings are left alone.
+    """
+
+    def __init__(self, settings: ResourceSettings | None = None):
+        self.settings = settings or ResourceSettings()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._local = threading.local()
+        self._workers: dict[str, ThreadPoolExecutor] = {}
+        self._default_threads = None
+        self._configure_torch()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _configure_torch(self) -> None:
+        # runs before any model loads: torch refuses inter-op changes once the pool exists
+        budgets = self.settings.model_threads or self.settings.model_cores
+        if not budgets and not self.settings.interop_threads:
+            return
+        import torch
+        if self.settings.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.settings.interop_threads)
+            except RuntimeError as e:
+                raise RuntimeError(
+                    f"Could not set LORE_INTEROP_THREADS={self.settings.interop_threads}: {e}"
+                ) from e
+        if budgets:
+            self._default_threads = torch.get_num_threads()
+            for name in MODEL_NAMES:
+                self._workers[name] = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix=f"lore-{name}",
+                    initializer=self._init_worker,
+                    initargs=(name,),
+                )
+
+    def _init_worker(self, model_name: str) -> None:
+        cores = self.settings.model_cores.get(model_name)
+        if cores and hasattr(os, "sched_setaffinity"):
+            # pid 0 targets this worker thread only
+            os.sched_setaffinity(0, cores)
+        import torch
+        # torch initialises each thread's count from the process default on first use;
+        # trigger that now so it can't later overwrite the budget set below
+        torch.get_num_threads()
+        torch.set_num_threads(self._worker_threads(model_name))
+
+    def _worker_threads(self, model_name: str) -> int:
+        if model_name in self.settings.model_threads:
+            return self.settings.model_threads[model_name]
+        if model_name in self.settings.model_cores:
+            return len(self.settings.model_cores[model_name])
+        return max(1, self._default_threads // len(MODEL_NAMES))
+
+    def _acquire(self) -> None:
+        limit = self.settings.max_in_flight
+        with self._cond:
+            if self._in_flight >= limit and self._waiting >= self.settings.max_queue:
+                raise InferenceRejected("Inference queue is full", self.settings.retry_after)
+            self._waiting += 1
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: self._in_flight < limit, timeout=self.settings.queue_timeout
+                )
+            finally:
+                self._waiting -= 1
+            if not admitted:
+                raise InferenceRejected("Timed out waiting for an inference slot", self.settings.retry_after)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._acquire()
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._release()
+
+    def run(self, model_name: str, fn: Callable, *args, **kwargs):
+        with self.admit():
+            worker = self._workers.get(model_name)
+            if worker is None:
+                return fn(*args, **kwargs)
+            return worker.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self) -> None:
+        for worker in self._workers.values():
+            worker.shutdown(wait=True)
+        self._workers.clear()
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 
 from app.main import app
 from app.analyzer import BeliefAnalyzer
+from app.providers.resources import InferenceResourceManager, ResourceSettings
 
 
 class MockModelProvider:
@@ -21,6 +22,9 @@ class MockModelProvider:
         else:
             return 0
 
+    def memory_report(self) -> dict:
+        return {"process_rss_mb": 0.0, "budget_mb": None, "models": {}}
+
 
 class MockStorage:
     def __init__(self):
@@ -57,6 +61,7 @@ def client():
     main.sentiment_storage = MockGenericStorage()
     main.models = MockModelProvider()
     main.analyzer = BeliefAnalyzer(main.models, main.storage, main.risk_storage, main.sentiment_storage)
+    main.resources = InferenceResourceManager(ResourceSettings())
     return TestClient(app)
 
 
@@ -82,6 +87,13 @@ class TestHealthEndpoint:
         assert response.json() == {"status": "ok"}
 
 
+class TestModelsEndpoint:
+    def test_returns_memory_report(self, client):
+        response = client.get("/api/v1/models")
+        assert response.status_code == 200
+        assert "models" in response.json()
+
+
 class TestEvaluateBeliefsEndpoint:
     def test_returns_200(self, client, sample_payload):
         response = client.post("/api/v1/evaluate-beliefs", json=sample_payload)
@@ -99,6 +111,14 @@ class TestEvaluateBeliefsEndpoint:
         data = response.json()
         assert "downstream_outputs" in data
 
+    def test_returns_503_when_queue_full(self, client, sample_payload):
+        from app import main
+        main.resources = InferenceResourceManager(ResourceSettings(max_in_flight=0, max_queue=0, retry_after=3))
+        response = client.post("/api/v1/evaluate-beliefs", json=sample_payload)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+        assert main.storage.get_history(50) == []
+
 
 class TestHistoryEndpoint:
     def test_returns_empty_history_for_new_user(self, client):
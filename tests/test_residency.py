@@ -0,0 +1,256 @@
+import threading
+
+import pytest
+
+from app.providers import residency as residency_module
+from app.providers.residency import ModelResidency, model_size_bytes
+from app.providers.resources import ResourceSettings
+
+MB = 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_rss(monkeypatch):
+    """Each load grows the fake process RSS by the loaded model's size."""
+    state = {"rss": 100 * MB}
+    monkeypatch.setattr(residency_module, "current_rss_bytes", lambda: state["rss"])
+    return state
+
+
+def make_loaders(fake_rss, sizes_mb: dict[str, int], calls: list[str]):
+    def loader(name):
+        def load():
+            calls.append(name)
+            fake_rss["rss"] += sizes_mb[name] * MB
+            return f"{name}-model"
+        return load
+    return {name: loader(name) for name in sizes_mb}
+
+
+class SizedModel:
+    """Torch-like model whose weights are a single `size_mb` buffer."""
+
+    class _Weights:
+        def __init__(self, size_mb):
+            self.size_mb = size_mb
+
+        def numel(self):
+            return self.size_mb * MB
+
+        def element_size(self):
+            return 1
+
+    def __init__(self, size_mb: int):
+        self._weights = self._Weights(size_mb)
+
+    def parameters(self):
+        return [self._weights]
+
+    def buffers(self):
+        return []
+
+
+class TestModelResidency:
+    def test_loads_once_and_reports_rss(self, fake_rss):
+        calls = []
+        residency = ModelResidency(make_loaders(fake_rss, {"classifier": 300}, calls))
+        assert residency.get("classifier") == "classifier-model"
+        assert residency.get("classifier") == "classifier-model"
+        assert calls == ["classifier"]
+        report = residency.memory_report()
+        assert report["models"]["classifier"]["loaded"] is True
+        assert report["models"]["classifier"]["weights_mb"] == 300
+
+    def test_budget_unloads_least_recently_used(self, fake_rss):
+        calls = []
+        clock = FakeClock()
+        residency = ModelResidency(
+            make_loaders(fake_rss, {"classifier": 300, "embedder": 100, "sentiment_grader": 200}, calls),
+            ResourceSettings(memory_budget_mb=450),
+            clock=clock,
+        )
+        residency.get("classifier")
+        clock.now = 1
+        residency.get("embedder")
+        clock.now = 2
+        residency.get("sentiment_grader")
+        assert not residency.is_loaded("classifier")
+        assert residency.is_loaded("embedder")
+        assert residency.is_loaded("sentiment_grader")
+
+    def test_budget_skips_models_in_use(self, fake_rss):
+        calls = []
+        clock = FakeClock()
+        residency = ModelResidency(
+            make_loaders(fake_rss, {"classifier": 300, "embedder": 100, "sentiment_grader": 200}, calls),
+            ResourceSettings(memory_budget_mb=450),
+            clock=clock,
+        )
+        with residency.use("classifier"):
+            clock.now = 1
+            residency.get("embedder")
+            clock.now = 2
+            residency.get("sentiment_grader")
+            assert residency.is_loaded("classifier")
+        assert not residency.is_loaded("embedder")
+
+    def test_idle_models_unload_and_reload(self, fake_rss):
+        calls = []
+        clock = FakeClock()
+        residency = ModelResidency(
+            make_loaders(fake_rss, {"classifier": 300, "embedder": 100}, calls),
+            ResourceSettings(idle_unload_seconds=60),
+            clock=clock,
+        )
+        residency.get("classifier")
+        clock.now = 50
+        residency.get("embedder")
+        clock.now = 70
+        assert residency.unload_idle() == ["classifier"]
+        report = residency.memory_report()["models"]["classifier"]
+        assert report["loaded"] is False
+        assert report["weights_mb"] == 300
+        assert residency.get("classifier") == "classifier-model"
+        assert calls == ["classifier", "embedder", "classifier"]
+
+    def test_reload_makes_room_before_loading(self, fake_rss):
+        calls = []
+        clock = FakeClock()
+        loaders = make_loaders(fake_rss, {"classifier": 300, "embedder": 100, "sentiment_grader": 50}, calls)
+        residency = ModelResidency(loaders, ResourceSettings(memory_budget_mb=420), clock=clock)
+        residency.get("classifier")
+        clock.now = 1
+        residency.get("embedder")
+        clock.now = 2
+        residency.get("sentiment_grader")  # first load: measured, then classifier evicted
+        assert residency.memory_report()["models"]["classifier"]["weights_mb"] == 300
+
+        seen_loaded = []
+        reload_classifier = loaders["classifier"]
+
+        def checked_load():
+            seen_loaded.append({n for n in ("embedder", "sentiment_grader") if residency.is_loaded(n)})
+            fake_rss["rss"] -= 300 * MB  # allocator reuse makes the RSS delta read ~0
+            return reload_classifier()
+
+        residency._slots["classifier"].loader = checked_load
+        clock.now = 3
+        residency.get("classifier")
+        # room was made before the load: the LRU embedder went, sentiment_grader still fits
+        assert seen_loaded == [{"sentiment_grader"}]
+        # a misleading ~0 RSS delta doesn't shrink the known size
+        assert residency.memory_report()["models"]["classifier"]["weights_mb"] == 300
+
+    def test_concurrent_reloads_count_each_other(self, fake_rss):
+        clock = FakeClock()
+        loaders = {
+            name: (lambda size=size: SizedModel(size))
+            for name, size in {"classifier": 200, "embedder": 200, "sentiment_grader": 150}.items()
+        }
+        residency = ModelResidency(loaders, ResourceSettings(memory_budget_mb=450), clock=clock)
+        for i, name in enumerate(("classifier", "embedder", "sentiment_grader")):
+            clock.now = i
+            residency.get(name)
+        for slot in residency._slots.values():
+            slot.model = None
+        clock.now = 10
+        residency.get("sentiment_grader")
+
+        started = threading.Event()
+        release = threading.Event()
+        reload_classifier = loaders["classifier"]
+
+        def slow_load():
+            started.set()
+            release.wait(5)
+            return reload_classifier()
+
+        residency._slots["classifier"].loader = slow_load
+        clock.now = 11
+        t = threading.Thread(target=residency.get, args=("classifier",))
+        t.start()
+        started.wait(5)
+        try:
+            clock.now = 12
+            # 150 loaded + 200 classifier in flight + 200 embedder: sentiment_grader must go
+            residency.get("embedder")
+            assert not residency.is_loaded("sentiment_grader")
+        finally:
+            release.set()
+            t.join()
+        assert residency.is_loaded("classifier") and residency.is_loaded("embedder")
+
+    def test_budget_rechecked_when_model_released(self, fake_rss):
+        calls = []
+        clock = FakeClock()
+        residency = ModelResidency(
+            make_loaders(fake_rss, {"classifier": 300, "embedder": 200}, calls),
+            ResourceSettings(memory_budget_mb=400),
+            clock=clock,
+        )
+        with residency.use("classifier"):
+            clock.now = 1
+            with residency.use("embedder"):
+                assert residency.is_loaded("classifier") and residency.is_loaded("embedder")
+            clock.now = 2
+        # classifier is now the most recently released, embedder the LRU idle model
+        assert residency.is_loaded("classifier")
+        assert not residency.is_loaded("embedder")
+
+    def test_load_does_not_block_other_models(self, fake_rss):
+        calls = []
+        loaders = make_loaders(fake_rss, {"classifier": 300, "embedder": 100}, calls)
+        started = threading.Event()
+        release = threading.Event()
+        slow_classifier = loaders["classifier"]
+
+        def slow_load():
+            started.set()
+            release.wait(5)
+            return slow_classifier()
+
+        loaders["classifier"] = slow_load
+        residency = ModelResidency(loaders)
+        t = threading.Thread(target=residency.get, args=("classifier",))
+        t.start()
+        started.wait(5)
+        try:
+            assert residency.get("embedder") == "embedder-model"
+            assert not residency.is_loaded("classifier")
+        finally:
+            release.set()
+            t.join()
+        assert residency.is_loaded("classifier")
+
+    def test_measures_torch_model_weights(self):
+        class FakeTensor:
+            def __init__(self, numel, element_size):
+                self._numel, self._element_size = numel, element_size
+
+            def numel(self):
+                return self._numel
+
+            def element_size(self):
+                return self._element_size
+
+        class FakeModule:
+            def parameters(self):
+                return [FakeTensor(1000, 4), FakeTensor(500, 2)]
+
+            def buffers(self):
+                return [FakeTensor(10, 8)]
+
+        class FakePipeline:
+            model = FakeModule()
+
+        assert model_size_bytes(FakePipeline()) == 5080
+        assert model_size_bytes(FakeModule()) == 5080
+        assert model_size_bytes("not a model") is None
@@ -0,0 +1,217 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from app.providers.resources import (
+    InferenceRejected,
+    InferenceResourceManager,
+    ResourceSettings,
+    parse_core_set,
+)
+
+
+class TestResourceSettings:
+    def test_defaults_without_env(self):
+        settings = ResourceSettings.from_env({})
+        assert settings.max_in_flight == 2
+        assert settings.model_threads == {}
+        assert settings.model_cores == {}
+
+    def test_reads_env(self, fake_affinity):
+        settings = ResourceSettings.from_env({
+            "LORE_MAX_IN_FLIGHT": "4",
+            "LORE_MAX_QUEUE": "0",
+            "LORE_RETRY_AFTER": "9",
+            "LORE_THREADS_CLASSIFIER": "3",
+            "LORE_CORES_EMBEDDER": "0-1,4",
+        })
+        assert settings.max_in_flight == 4
+        assert settings.max_queue == 0
+        assert settings.retry_after == 9
+        assert settings.model_threads == {"classifier": 3}
+        assert settings.model_cores == {"embedder": {0, 1, 4}}
+
+    @pytest.mark.parametrize("env, match", [
+        ({"LORE_MAX_IN_FLIGHT": "0"}, "LORE_MAX_IN_FLIGHT"),
+        ({"LORE_THREADS_CLASSIFIER": "0"}, "LORE_THREADS_CLASSIFIER"),
+        ({"LORE_INTEROP_THREADS": "-1"}, "LORE_INTEROP_THREADS"),
+        ({"LORE_CORES_EMBEDDER": ","}, "LORE_CORES_EMBEDDER"),
+        ({"LORE_CORES_EMBEDDER": "3-1"}, "reversed"),
+        ({"LORE_CORES_EMBEDDER": "6-9"}, "LORE_CORES_EMBEDDER"),
+    ])
+    def test_rejects_invalid_cpu_settings(self, fake_affinity, env, match):
+        with pytest.raises(ValueError, match=match):
+            ResourceSettings.from_env(env)
+
+    def test_rejects_unsupported_dtype(self):
+        assert ResourceSettings.from_env({"LORE_MODEL_DTYPE": "bfloat16"}).model_dtype == "bfloat16"
+        with pytest.raises(ValueError, match="LORE_MODEL_DTYPE"):
+            ResourceSettings.from_env({"LORE_MODEL_DTYPE": "float16"})
+
+    def test_parse_core_set(self):
+        assert parse_core_set("0-2, 5") == {0, 1, 2, 5}
+        assert parse_core_set("") == set()
+
+
+class TestAdmission:
+    def test_rejects_when_queue_full(self):
+        resources = InferenceResourceManager(ResourceSettings(max_in_flight=1, max_queue=0, retry_after=7))
+        with resources.admit():
+            result = {}
+
+            def other():
+                try:
+                    with resources.admit():
+                        pass
+                except InferenceRejected as e:
+                    result["retry_after"] = e.retry_after
+
+            t = threading.Thread(target=other)
+            t.start()
+            t.join()
+        assert result["retry_after"] == 7
+        assert resources.in_flight == 0
+
+    def test_times_out_in_queue(self):
+        resources = InferenceResourceManager(ResourceSettings(max_in_flight=1, max_queue=1, queue_timeout=0.05))
+        with resources.admit():
+            errors = []
+
+            def other():
+                try:
+                    with resources.admit():
+                        pass
+                except InferenceRejected as e:
+                    errors.append(e)
+
+            t = threading.Thread(target=other)
+            t.start()
+            t.join()
+        assert len(errors) == 1
+        assert resources.waiting == 0
+
+    def test_admit_is_reentrant(self):
+        resources = InferenceResourceManager(ResourceSettings(max_in_flight=1, max_queue=0))
+        with resources.admit():
+            assert resources.run("classifier", lambda: resources.in_flight) == 1
+        assert resources.in_flight == 0
+
+    def test_queued_request_runs_after_release(self):
+        resources = InferenceResourceManager(ResourceSettings(max_in_flight=1, max_queue=1, queue_timeout=5))
+        done = []
+
+        def other():
+            with resources.admit():
+                done.append(True)
+
+        with resources.admit():
+            t = threading.Thread(target=other)
+            t.start()
+            deadline = time.monotonic() + 5
+            while resources.waiting != 1 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            assert resources.waiting == 1
+            assert done == []
+        t.join()
+        assert done == [True]
+
+
+class FakeTorch:
+    """Records which thread set which intra-op thread count."""
+
+    def __init__(self, default_threads: int = 8, refuse_interop: bool = False):
+        self.default_threads = default_threads
+        self.refuse_interop = refuse_interop
+        self.thread_counts: dict[int, int] = {}
+        self.interop_threads = None
+
+    def get_num_threads(self) -> int:
+        return self.thread_counts.get(threading.get_ident(), self.default_threads)
+
+    def set_num_threads(self, n: int) -> None:
+        self.thread_counts[threading.get_ident()] = n
+
+    def set_num_interop_threads(self, n: int) -> None:
+        if self.refuse_interop:
+            raise RuntimeError("cannot set number of interop threads after parallel work has started")
+        self.interop_threads = n
+
+
+@pytest.fixture
+def fake_torch(monkeypatch):
+    torch = FakeTorch()
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    return torch
+
+
+@pytest.fixture
+def fake_affinity(monkeypatch):
+    """Per-thread affinity that starts as all of {0..7}."""
+    affinity: dict[int, set[int]] = {}
+    calls = []
+
+    def getaffinity(pid):
+        return affinity.get(threading.get_ident(), set(range(8)))
+
+    def setaffinity(pid, cores):
+        calls.append((pid, threading.get_ident(), set(cores)))
+        affinity[threading.get_ident()] = set(cores)
+
+    monkeypatch.setattr("os.sched_getaffinity", getaffinity, raising=False)
+    monkeypatch.setattr("os.sched_setaffinity", setaffinity, raising=False)
+    return calls
+
+
+class TestCpuBudgets:
+    def test_runs_inline_without_budgets(self):
+        resources = InferenceResourceManager(ResourceSettings())
+        assert resources.run("classifier", threading.get_ident) == threading.get_ident()
+
+    def test_pins_model_worker_not_caller(self, fake_torch, fake_affinity):
+        import os
+        resources = InferenceResourceManager(ResourceSettings(model_cores={"classifier": {0, 1}}))
+        try:
+            caller = threading.get_ident()
+            worker, cores = resources.run("classifier", lambda: (threading.get_ident(), os.sched_getaffinity(0)))
+            assert worker != caller
+            assert cores == {0, 1}
+            assert fake_affinity == [(0, worker, {0, 1})]
+            # the calling thread keeps its original affinity
+            assert os.sched_getaffinity(0) == set(range(8))
+            # later calls reuse the same pinned worker
+            assert resources.run("classifier", threading.get_ident) == worker
+        finally:
+            resources.shutdown()
+
+    def test_thread_budget_applied_per_worker(self, fake_torch):
+        resources = InferenceResourceManager(ResourceSettings(model_threads={"classifier": 4, "embedder": 1}))
+        try:
+            classifier = resources.run("classifier", threading.get_ident)
+            embedder = resources.run("embedder", threading.get_ident)
+            sentiment = resources.run("sentiment_grader", threading.get_ident)
+            assert fake_torch.thread_counts[classifier] == 4
+            assert fake_torch.thread_counts[embedder] == 1
+            # models without a budget share the default captured at startup
+            assert fake_torch.thread_counts[sentiment] == 8 // 3
+            assert resources.run("classifier", fake_torch.get_num_threads) == 4
+        finally:
+            resources.shutdown()
+
+    def test_pinned_model_defaults_to_one_thread_per_core(self, fake_torch, fake_affinity):
+        resources = InferenceResourceManager(ResourceSettings(model_cores={"classifier": {0, 1}}))
+        try:
+            classifier = resources.run("classifier", threading.get_ident)
+            assert fake_torch.thread_counts[classifier] == 2
+        finally:
+            resources.shutdown()
+
+    def test_interop_threads_set_at_startup(self, fake_torch):
+        InferenceResourceManager(ResourceSettings(interop_threads=2))
+        assert fake_torch.interop_threads == 2
+
+    def test_refused_interop_threads_raise(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "torch", FakeTorch(refuse_interop=True))
+        with pytest.raises(RuntimeError, match="LORE_INTEROP_THREADS"):
+            InferenceResourceManager(ResourceSettings(interop_threads=2))